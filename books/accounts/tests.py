@@ -1,6 +1,13 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from .forms import LoginForm, SignupForm
 
 class BaseTestCase(TestCase):
@@ -87,3 +94,57 @@ class TestLogin(BaseTestCase):
         # Check if the user is not logged in
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Please enter a correct username and password. Note that both fields may be case-sensitive.', html=True)
+
+
+class TestProvisionUsers(BaseTestCase):
+    def write_records(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_provision_csv(self):
+        Group.objects.create(name='partners')
+        path = self.write_records('.csv', (
+            'username,email,password,groups\n'
+            'partner1,p1@test.com,s3cret-pass,partners\n'
+            'partner1,again@test.com,s3cret-pass,\n'
+            'partner2,p2@test.com,s3cret-pass,partners;staff\n'
+            'testuser,dup@test.com,s3cret-pass,\n'
+            'partner3,not-an-email,s3cret-pass,\n'
+        ))
+        out, err = StringIO(), StringIO()
+        call_command('provision_users', path, workers=2, batch_size=2, stdout=out, stderr=err)
+
+        self.assertIn('Created 1 users', out.getvalue())
+        self.assertIn('4 records rejected', out.getvalue())
+        self.assertIn("unknown group 'staff'", err.getvalue())
+        self.assertIn('username already exists', err.getvalue())
+        self.assertIn('duplicate username in input', err.getvalue())
+
+        user = get_user_model().objects.get(username='partner1')
+        self.assertTrue(user.check_password('s3cret-pass'))
+        self.assertEqual(list(user.groups.values_list('name', flat=True)), ['partners'])
+
+    def test_provision_jsonl(self):
+        path = self.write_records('.jsonl', '\n'.join([
+            json.dumps({'username': 'partner1', 'password': 's3cret-pass', 'groups': ['partners', 'staff']}),
+            'not json',
+            json.dumps({'username': 'partner3', 'password': 's3cret-pass', 'groups': 5}),
+            json.dumps({'username': 'partner2', 'password': 's3cret-pass'}),
+        ]))
+        out, err = StringIO(), StringIO()
+        call_command('provision_users', path, workers=1, create_groups=True, stdout=out, stderr=err)
+
+        self.assertIn('Created 2 users', out.getvalue())
+        self.assertIn('2 records rejected', out.getvalue())
+        self.assertIn('line 2 (?): not a JSON object', err.getvalue())
+        self.assertIn('line 3 (?): groups must be a list', err.getvalue())
+        user = get_user_model().objects.get(username='partner1')
+        self.assertTrue(user.check_password('s3cret-pass'))
+        self.assertEqual(sorted(user.groups.values_list('name', flat=True)), ['partners', 'staff'])
+
+    def test_missing_file(self):
+        with self.assertRaisesMessage(CommandError, 'Cannot read /nonexistent/users.csv'):
+            call_command('provision_users', '/nonexistent/users.csv', workers=1)
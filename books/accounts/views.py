@@ -4,9 +4,11 @@ from django.shortcuts import render
 # accounts/views.py
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout, authenticate
+from books.querybudget import query_budget
 from .forms import LoginForm
 from .forms import SignupForm
 
+@query_budget(max_queries=7, max_time_ms=1000)
 def login_view(request):
     if request.method == 'POST':
         form = LoginForm(request, data=request.POST)
@@ -19,10 +21,12 @@ def login_view(request):
 
     return render(request, 'accounts/login.html', {'form': form})
 
+@query_budget(max_queries=5, max_time_ms=1000)
 def logout_view(request):
     logout(request)
     return redirect('index')
 
+@query_budget(max_queries=9, max_time_ms=1000)
 def signup(request):
     if request.method == 'POST':
         form = SignupForm(request.POST)
@@ -35,5 +39,6 @@ def signup(request):
 
     return render(request, 'accounts/signup.html', {'form': form})
 
+@query_budget(max_queries=3, max_time_ms=1000)
 def success(request):
     return render(request, 'accounts/success.html')
\ No newline at end of file
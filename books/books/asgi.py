@@ -11,6 +11,9 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from books.warmup import warm_up_application
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'books.settings')
 
-application = get_asgi_application()
+# Sync views run in executor threads, so a connection opened here would never be used.
+application = warm_up_application(get_asgi_application, connect_db=False)
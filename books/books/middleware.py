@@ -0,0 +1,239 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from books.querybudget import query_budget
+
+DEFAULT_ADMISSION_CONTROL = {
+    # Maximum in-flight requests per route class and worker process before
+    # shedding with 503. A sync WSGI worker serves one request at a time, so
+    # these only take effect with threaded (e.g. gunicorn --threads) or ASGI
+    # workers. Sized for 8 threads per worker: no class can take them all, and
+    # password hashing (auth) never holds more than a quarter of them.
+    'CONCURRENCY_LIMITS': {
+        'api': 6,
+        'auth': 2,
+        'default': 4,
+    },
+    # URL namespaces mapped to route classes; anything else is 'default'.
+    'ROUTE_CLASSES': {
+        'products': 'api',
+        'accounts': 'auth',
+    },
+    # Token buckets per client for expensive POSTs: (capacity, refill per second).
+    'RATE_LIMITS': {
+        'accounts:login': (10, 0.2),
+        'accounts:signup': (5, 0.05),
+    },
+    # Rate limits are keyed on REMOTE_ADDR by default, which behind a reverse
+    # proxy is the proxy's address. Set CLIENT_IP_HEADER to a request.META key
+    # such as 'HTTP_X_FORWARDED_FOR' to read the address from that header
+    # instead, taking the entry TRUSTED_PROXY_COUNT places from the right
+    # (each trusted proxy appends the address it received the request from;
+    # anything further left is client-supplied and can be forged).
+    'CLIENT_IP_HEADER': None,
+    'TRUSTED_PROXY_COUNT': 1,
+    'RETRY_AFTER': 1,
+    'MAX_TRACKED_CLIENTS': 10000,
+}
+
+
+def get_admission_settings():
+    config = dict(DEFAULT_ADMISSION_CONTROL)
+    config.update(getattr(settings, 'ADMISSION_CONTROL', {}))
+    return config
+
+
+class TokenBucket:
+    def __init__(self, capacity, rate, now):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, now):
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self):
+        if self.rate <= 0:
+            return None
+        return max(1, math.ceil((1 - self.tokens) / self.rate))
+
+
+class AdmissionController:
+    """
+    Process-wide in-flight counters and per-client token buckets.
+
+    State lives per worker process; limits are therefore per worker too, and
+    in-flight counts never exceed 1 under single-threaded workers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.in_flight = {}
+            self.shed = {}
+            self.buckets = {}
+            self.rate_limited = {}
+
+    def acquire(self, route_class, limit):
+        with self.lock:
+            if self.in_flight.get(route_class, 0) >= limit:
+                self.shed[route_class] = self.shed.get(route_class, 0) + 1
+                return False
+            self.in_flight[route_class] = self.in_flight.get(route_class, 0) + 1
+            return True
+
+    def release(self, route_class):
+        with self.lock:
+            self.in_flight[route_class] -= 1
+
+    def consume(self, view_name, client, capacity, rate, max_clients):
+        """Take a token for ``client`` on ``view_name``; return a Retry-After in seconds if empty."""
+        now = time.monotonic()
+        key = (view_name, client)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= max_clients:
+                    self.evict_idle(now, max_clients)
+                bucket = self.buckets[key] = TokenBucket(capacity, rate, now)
+            if bucket.consume(now):
+                return None
+            self.rate_limited[view_name] = self.rate_limited.get(view_name, 0) + 1
+            return bucket.retry_after() or 1
+
+    def evict_idle(self, now, max_clients):
+        for key, bucket in list(self.buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self.buckets[key]
+        # Still full of active clients: drop the least recently used half.
+        if len(self.buckets) >= max_clients:
+            stale = sorted(self.buckets, key=lambda key: self.buckets[key].updated)
+            for key in stale[:len(stale) // 2]:
+                del self.buckets[key]
+
+    def snapshot(self):
+        config = get_admission_settings()
+        with self.lock:
+            clients = {}
+            for view_name, _ in self.buckets:
+                clients[view_name] = clients.get(view_name, 0) + 1
+            return {
+                'concurrency': {
+                    route_class: {
+                        'limit': limit,
+                        'in_flight': self.in_flight.get(route_class, 0),
+                        'shed': self.shed.get(route_class, 0),
+                    }
+                    for route_class, limit in config['CONCURRENCY_LIMITS'].items()
+                },
+                'rate_limits': {
+                    view_name: {
+                        'capacity': capacity,
+                        'refill_per_second': rate,
+                        'tracked_clients': clients.get(view_name, 0),
+                        'rejected': self.rate_limited.get(view_name, 0),
+                    }
+                    for view_name, (capacity, rate) in config['RATE_LIMITS'].items()
+                },
+            }
+
+
+admission_controller = AdmissionController()
+
+
+class AdmissionControlMiddleware:
+    """
+    Shed load early instead of letting requests queue behind each other.
+
+    Each request is classified by URL namespace and counted against that
+    class's concurrency limit (503 when full). POSTs to the views listed in
+    ``RATE_LIMITS`` additionally draw from a per-client token bucket (429
+    when empty), so password-hash floods cannot starve the product API.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.controller = admission_controller
+
+    def __call__(self, request):
+        config = get_admission_settings()
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            match = None
+
+        if match is not None and request.method == 'POST' and match.view_name in config['RATE_LIMITS']:
+            capacity, rate = config['RATE_LIMITS'][match.view_name]
+            retry_after = self.controller.consume(
+                match.view_name, self.get_client(request, config), capacity, rate, config['MAX_TRACKED_CLIENTS'],
+            )
+            if retry_after is not None:
+                return self.reject(429, 'Too many requests.', retry_after)
+
+        route_class = self.get_route_class(match, config)
+        limit = config['CONCURRENCY_LIMITS'].get(route_class)
+        if limit is None:
+            return self.get_response(request)
+        if not self.controller.acquire(route_class, limit):
+            return self.reject(503, 'Server is busy.', config['RETRY_AFTER'])
+        try:
+            return self.get_response(request)
+        finally:
+            self.controller.release(route_class)
+
+    def get_route_class(self, match, config):
+        if match is not None:
+            for namespace in match.namespaces:
+                if namespace in config['ROUTE_CLASSES']:
+                    return config['ROUTE_CLASSES'][namespace]
+        return 'default'
+
+    def get_client(self, request, config):
+        header = config['CLIENT_IP_HEADER']
+        proxy_count = config['TRUSTED_PROXY_COUNT']
+        if header and proxy_count > 0:
+            addresses = [address.strip() for address in request.META.get(header, '').split(',') if address.strip()]
+            if len(addresses) >= proxy_count:
+                return addresses[-proxy_count]
+        return request.META.get('REMOTE_ADDR', '')
+
+    def reject(self, status, detail, retry_after):
+        response = JsonResponse({'detail': detail}, status=status)
+        response['Retry-After'] = str(retry_after)
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Run every request under a request-wide query budget so repeated SQL
+    shapes (N+1 patterns) are logged even for views without a declared budget.
+
+    Unless ``QUERY_BUDGET['RAISE']`` is set, only a ``SAMPLE_RATE`` share of
+    requests is tracked; the rest, including any view budgets they enter,
+    run without a query wrapper.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with query_budget(name=f'{request.method} {request.path}'):
+            return self.get_response(request)
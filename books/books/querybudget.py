@@ -0,0 +1,195 @@
+"""
+Query budgets: cap the number of SQL queries and the SQL time a block of
+code (usually a view) may spend, and spot N+1 patterns, i.e. the same SQL
+shape executed over and over within one budget.
+
+``query_budget`` works as a context manager, a function decorator and a
+class decorator (wrapping the view's ``dispatch``)::
+
+    @query_budget(max_queries=3, max_time_ms=1000)
+    class ProductList(generics.ListCreateAPIView):
+        ...
+
+Violations raise ``QueryBudgetExceeded`` when ``QUERY_BUDGET['RAISE']`` is
+true (the test runner turns it on) and are otherwise logged with the
+offending stacks. When only logging, a ``SAMPLE_RATE`` share of requests is
+tracked: the outermost budget (``QueryBudgetMiddleware``'s, at request
+entry) decides, nested budgets follow it, and untracked blocks run without
+a query wrapper.
+"""
+import contextvars
+import functools
+import logging
+import random
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_BUDGET = {
+    'RAISE': False,
+    'SAMPLE_RATE': 0.1,
+    # Identical SQL shapes executed this many times within one budget count as N+1.
+    'N_PLUS_ONE_THRESHOLD': 10,
+    'STACK_LIMIT': 25,
+}
+
+# Budgets entered in the current thread or task, outermost first.
+active_budgets = contextvars.ContextVar('active_budgets', default=())
+
+PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+WHITESPACE = re.compile(r'\s+')
+
+
+def get_query_budget_settings():
+    config = dict(DEFAULT_QUERY_BUDGET)
+    config.update(getattr(settings, 'QUERY_BUDGET', {}))
+    return config
+
+
+def sql_shape(sql):
+    """Normalise SQL so queries differing only in parameters or IN-list length compare equal."""
+    return WHITESPACE.sub(' ', PLACEHOLDER_LIST.sub('%s', sql)).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget:
+    def __init__(self, max_queries=None, max_time_ms=None, name=None, n_plus_one_threshold=None, raise_on_violation=None):
+        self.max_queries = max_queries
+        self.max_time_ms = max_time_ms
+        self.name = name
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.raise_on_violation = raise_on_violation
+
+    def copy(self, **overrides):
+        options = {
+            'max_queries': self.max_queries,
+            'max_time_ms': self.max_time_ms,
+            'name': self.name,
+            'n_plus_one_threshold': self.n_plus_one_threshold,
+            'raise_on_violation': self.raise_on_violation,
+        }
+        options.update(overrides)
+        return query_budget(**options)
+
+    def __call__(self, view):
+        if isinstance(view, type):
+            dispatch = view.dispatch
+            budget = self.copy(name=self.name or view.__qualname__)
+
+            @functools.wraps(dispatch)
+            def budgeted_dispatch(instance, request, *args, **kwargs):
+                with budget.copy():
+                    return dispatch(instance, request, *args, **kwargs)
+
+            view.dispatch = budgeted_dispatch
+            view.query_budget = budget
+            return view
+
+        budget = self.copy(name=self.name or view.__qualname__)
+
+        @functools.wraps(view)
+        def budgeted(*args, **kwargs):
+            # A fresh copy per call keeps concurrent calls from sharing counters.
+            with budget.copy():
+                return view(*args, **kwargs)
+
+        budgeted.query_budget = budget
+        return budgeted
+
+    def __enter__(self):
+        config = get_query_budget_settings()
+        if self.n_plus_one_threshold is None:
+            self.n_plus_one_threshold = config['N_PLUS_ONE_THRESHOLD']
+        if self.raise_on_violation is None:
+            self.raise_on_violation = config['RAISE']
+        self.stack_limit = config['STACK_LIMIT']
+
+        outer = active_budgets.get()
+        if self.raise_on_violation:
+            self.sampled = True
+        elif outer:
+            self.sampled = outer[-1].sampled
+        else:
+            self.sampled = random.random() < config['SAMPLE_RATE']
+
+        self.count = 0
+        self.time_ms = 0.0
+        self.shapes = Counter()
+        self.stacks = {}
+        # Shapes an inner budget already reported as N+1.
+        self.reported_shapes = set()
+        self.exit_stack = ExitStack()
+        if self.sampled:
+            for connection in connections.all():
+                self.exit_stack.enter_context(connection.execute_wrapper(self.record))
+        self.token = active_budgets.set(outer + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        active_budgets.reset(self.token)
+        self.exit_stack.close()
+        if exc_type is None and self.sampled:
+            self.check()
+        return False
+
+    def record(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time_ms += (time.perf_counter() - started) * 1000
+            self.count += 1
+            shape = sql_shape(sql)
+            self.shapes[shape] += 1
+            # Only capture stacks at the moment a limit is crossed; they are expensive.
+            if self.max_queries is not None and self.count == self.max_queries + 1:
+                self.stacks['max_queries'] = self.capture_stack()
+            if self.n_plus_one_threshold and self.shapes[shape] == self.n_plus_one_threshold:
+                self.stacks[shape] = self.capture_stack()
+
+    def capture_stack(self):
+        return ''.join(traceback.format_list(traceback.extract_stack(limit=self.stack_limit)[:-2]))
+
+    @property
+    def repeated_shapes(self):
+        if not self.n_plus_one_threshold:
+            return {}
+        return {
+            shape: count for shape, count in self.shapes.items()
+            if count >= self.n_plus_one_threshold and shape not in self.reported_shapes
+        }
+
+    def violations(self):
+        violations = []
+        if self.max_queries is not None and self.count > self.max_queries:
+            violations.append(f"{self.count} queries exceeds the budget of {self.max_queries}")
+        if self.max_time_ms is not None and self.time_ms > self.max_time_ms:
+            violations.append(f"{self.time_ms:.1f} ms of SQL exceeds the budget of {self.max_time_ms} ms")
+        for shape, count in self.repeated_shapes.items():
+            violations.append(f"possible N+1: {count} executions of {shape!r}")
+        return violations
+
+    def check(self):
+        violations = self.violations()
+        if not violations:
+            return
+        # Enclosing budgets saw the same queries; don't report these N+1 shapes twice.
+        for budget in active_budgets.get():
+            budget.reported_shapes.update(self.repeated_shapes)
+        message = f"Query budget exceeded in {self.name or 'block'}: " + '; '.join(violations)
+        if self.raise_on_violation:
+            raise QueryBudgetExceeded(message)
+        stacks = '\n'.join(
+            f"-- {key}\n{stack}" for key, stack in self.stacks.items() if key not in self.reported_shapes
+        )
+        logger.warning("%s\n%s", message, stacks)
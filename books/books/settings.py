@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +48,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'books.middleware.AdmissionControlMiddleware',
+    'books.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,15 +79,94 @@ TEMPLATES = [
 WSGI_APPLICATION = 'books.wsgi.application'
 
 
+# Admission control and load shedding. Defaults are DEFAULT_ADMISSION_CONTROL
+# in books/middleware.py; set ADMISSION_CONTROL = {...} to override keys.
+
+
+# Products not updated for this many days are moved to the archive table
+# by `manage.py archive_products` (see products/archive.py)
+
+PRODUCT_ARCHIVE_AFTER_DAYS = 365
+
+
+# Product list filters and facet counts (see products/filters.py, products/facets.py)
+
+PRODUCT_LOW_STOCK_THRESHOLD = 5
+
+# (min, max) price bands; max is exclusive and None means unbounded
+PRODUCT_PRICE_BANDS = [(0, 10), (10, 25), (25, 50), (50, 100), (100, None)]
+
+PRODUCT_FACETS_CACHE_TIMEOUT = 300
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+#
+# Without REDIS_URL each worker process has its own LocMemCache, so cached
+# facet counts are only invalidated in the worker that handled the write;
+# other workers can serve stale counts for up to PRODUCT_FACETS_CACHE_TIMEOUT.
+# Set REDIS_URL (requires the `redis` package) to share the cache.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
+
+# Query budgets. Defaults are DEFAULT_QUERY_BUDGET in books/querybudget.py;
+# set QUERY_BUDGET = {...} to override keys. The test runner below makes
+# violations raise instead of being logged.
+
+TEST_RUNNER = 'books.test_runner.QueryBudgetTestRunner'
+
+
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Select the backend with BOOKS_DB=sqlite (default) or BOOKS_DB=postgres.
+# The PostgreSQL profile uses psycopg from requirements.txt.
+
+DATABASE_PROFILE = os.environ.get('BOOKS_DB', 'sqlite')
+
+if DATABASE_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'books'),
+            'USER': os.environ.get('POSTGRES_USER', 'books'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'OPTIONS': {
+                # Abort runaway queries instead of letting them hold a worker.
+                'options': '-c statement_timeout={}'.format(os.environ.get('POSTGRES_STATEMENT_TIMEOUT_MS', '5000')),
+            },
+            # QuerySet.iterator() uses server-side cursors on PostgreSQL; they must be
+            # disabled behind a transaction-pooling proxy such as PgBouncer.
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('POSTGRES_DISABLE_SERVER_SIDE_CURSORS') == '1',
+        }
+    }
+    if django.VERSION >= (5, 1):
+        # Native psycopg connection pool (Django 5.1+).
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', '10')),
+            'timeout': int(os.environ.get('POSTGRES_POOL_TIMEOUT', '10')),
+        }
+    else:
+        # Persistent connections until the pool is available.
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('POSTGRES_CONN_MAX_AGE', '60'))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
-}
 
 
 # Password validation
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """Test runner that turns query budget violations into test failures."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.query_budget_override = override_settings(
+            QUERY_BUDGET={**getattr(settings, 'QUERY_BUDGET', {}), 'RAISE': True},
+        )
+        self.query_budget_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.query_budget_override.disable()
+        super().teardown_test_environment(**kwargs)
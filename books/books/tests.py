@@ -1,7 +1,14 @@
-from django.test import TestCase, Client
+from unittest import mock
+from django.core.signals import request_started
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
+from books.middleware import admission_controller
+from books.querybudget import QueryBudgetExceeded, query_budget, sql_shape
+from books.warmup import warm_up
 # from django.contrib.auth.models import User
 from accounts.models import CustomUser
+from books.views import index
 class BooksTestCase(TestCase):
     def setUp(self):
         self.client = Client()
@@ -29,3 +36,181 @@ class BooksTestCase(TestCase):
         response = self.client.get(reverse('index'))
         self.assertContains(response, '<a href="' + reverse('accounts:logout') + '">Logout</a>', html=True)
         self.assertContains(response, 'Hello, testuser!', html=True)
+
+
+class AdmissionControlTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.staff = CustomUser.objects.create_user(username='staff', password='testpassword', is_staff=True)
+        admission_controller.reset()
+
+    def tearDown(self):
+        admission_controller.reset()
+
+    @override_settings(ADMISSION_CONTROL={'RATE_LIMITS': {'accounts:login': (2, 0)}})
+    def test_login_rate_limit(self):
+        login_url = reverse('accounts:login')
+        for _ in range(2):
+            response = self.client.post(login_url, {'username': 'testuser', 'password': 'wrongpassword'})
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(login_url, {'username': 'testuser', 'password': 'wrongpassword'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+        # Other clients and GETs are unaffected
+        response = self.client.post(login_url, {'username': 'testuser', 'password': 'wrongpassword'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(login_url)
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_login(self.staff)
+        metrics = self.client.get(reverse('admission-metrics')).json()
+        self.assertEqual(metrics['rate_limits']['accounts:login']['rejected'], 1)
+        self.assertEqual(metrics['rate_limits']['accounts:login']['tracked_clients'], 2)
+
+    @override_settings(ADMISSION_CONTROL={
+        'RATE_LIMITS': {'accounts:login': (1, 0)},
+        'CLIENT_IP_HEADER': 'HTTP_X_FORWARDED_FOR',
+        'TRUSTED_PROXY_COUNT': 2,
+    })
+    def test_client_ip_header(self):
+        login_url = reverse('accounts:login')
+        data = {'username': 'testuser', 'password': 'wrongpassword'}
+        response = self.client.post(login_url, data, HTTP_X_FORWARDED_FOR='203.0.113.1, 10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+
+        # A forged leftmost entry doesn't make a new client
+        response = self.client.post(login_url, data, HTTP_X_FORWARDED_FOR='198.51.100.7, 203.0.113.1, 10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(login_url, data, HTTP_X_FORWARDED_FOR='203.0.113.2, 10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+
+        # Too few entries to have passed through both proxies: fall back to REMOTE_ADDR
+        response = self.client.post(login_url, data, HTTP_X_FORWARDED_FOR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(login_url, data)
+        self.assertEqual(response.status_code, 429)
+
+    def test_metrics_staff_only(self):
+        response = self.client.get(reverse('admission-metrics'))
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(CustomUser.objects.create_user(username='regular', password='testpassword'))
+        response = self.client.get(reverse('admission-metrics'))
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admission-metrics'))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ADMISSION_CONTROL={'CONCURRENCY_LIMITS': {'api': 0, 'default': 64}, 'RETRY_AFTER': 3})
+    def test_concurrency_limit(self):
+        response = self.client.get(reverse('products:product-list'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+
+        # Routes in other classes keep being served
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_login(self.staff)
+        metrics = self.client.get(reverse('admission-metrics')).json()
+        self.assertEqual(metrics['concurrency']['api'], {'limit': 0, 'in_flight': 0, 'shed': 1})
+        self.assertEqual(metrics['concurrency']['default']['in_flight'], 1)
+
+
+class WarmUpTestCase(TransactionTestCase):
+    # Not TestCase: its open transaction makes Django close the connection on request_started.
+    def set_conn_max_age(self, conn_max_age):
+        self.addCleanup(setattr, connection, 'close_at', connection.close_at)
+        self.addCleanup(connection.settings_dict.__setitem__, 'CONN_MAX_AGE', connection.settings_dict['CONN_MAX_AGE'])
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        # Closing is a no-op for the in-memory test database, so reset what connect() would set.
+        connection.close()
+        connection.close_at = None
+
+    def test_warm_up(self):
+        self.set_conn_max_age(None)
+        timings = warm_up()
+        self.assertEqual(list(timings), ['url_resolver', 'drf', 'templates', 'databases'])
+
+        timings = warm_up(connect_db=False)
+        self.assertNotIn('databases', timings)
+
+        # Preloading must not hand database connections to forked workers
+        with mock.patch('books.warmup.connections.close_all') as close_all, mock.patch('books.warmup.gc.freeze') as freeze:
+            timings = warm_up(preload=True)
+        self.assertNotIn('databases', timings)
+        close_all.assert_called_once()
+        freeze.assert_called_once()
+
+    def test_skips_non_persistent_connections(self):
+        self.set_conn_max_age(0)
+        self.assertNotIn('databases', warm_up())
+
+    def test_connection_survives_first_request(self):
+        self.set_conn_max_age(None)
+        self.assertIn('databases', warm_up())
+        self.assertIsNotNone(connection.connection)
+        with mock.patch.object(connection, 'close') as close:
+            request_started.send(sender=self.__class__)
+        close.assert_not_called()
+
+
+class QueryBudgetTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(username='testuser', password='testpassword')
+
+    def test_max_queries(self):
+        with query_budget(max_queries=2) as budget:
+            CustomUser.objects.count()
+            CustomUser.objects.exists()
+        self.assertEqual(budget.count, 2)
+
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(max_queries=1):
+                CustomUser.objects.count()
+                CustomUser.objects.exists()
+
+    def test_n_plus_one(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'possible N+1: 3 executions'):
+            with query_budget(n_plus_one_threshold=3):
+                for pk in [self.user.pk, self.user.pk + 1, self.user.pk + 2]:
+                    CustomUser.objects.filter(pk=pk).first()
+
+        self.assertEqual(
+            sql_shape('SELECT 1 FROM t WHERE id IN (%s, %s,\n %s)'),
+            sql_shape('SELECT 1 FROM t WHERE id IN (%s)'),
+        )
+
+    @override_settings(QUERY_BUDGET={'RAISE': False, 'SAMPLE_RATE': 1})
+    def test_logs_in_production(self):
+        with self.assertLogs('books.querybudget', level='WARNING') as logs:
+            with query_budget(max_queries=0, name='test block'):
+                CustomUser.objects.count()
+        self.assertIn('Query budget exceeded in test block: 1 queries exceeds the budget of 0', logs.output[0])
+        self.assertIn('test_logs_in_production', logs.output[0])
+
+    @override_settings(QUERY_BUDGET={'RAISE': False, 'SAMPLE_RATE': 0})
+    def test_unsampled_requests_are_not_tracked(self):
+        with self.assertNoLogs('books.querybudget'):
+            with query_budget(name='request') as outer, query_budget(max_queries=0) as inner:
+                CustomUser.objects.count()
+        self.assertEqual((outer.count, inner.count), (0, 0))
+
+    @override_settings(QUERY_BUDGET={'RAISE': False, 'SAMPLE_RATE': 1, 'N_PLUS_ONE_THRESHOLD': 3})
+    def test_nested_n_plus_one_logged_once(self):
+        with self.assertLogs('books.querybudget', level='WARNING') as logs:
+            with query_budget(name='request'), query_budget(name='view'):
+                for pk in [self.user.pk, self.user.pk + 1, self.user.pk + 2]:
+                    CustomUser.objects.filter(pk=pk).first()
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('Query budget exceeded in view: possible N+1: 3 executions', logs.output[0])
+
+    def test_view_budget(self):
+        self.client.login(username='testuser', password='testpassword')
+        with mock.patch.object(index.query_budget, 'max_queries', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('index'))
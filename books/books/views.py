@@ -1,4 +1,14 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from books.middleware import admission_controller
+from books.querybudget import query_budget
+
+@query_budget(max_queries=3, max_time_ms=1000)
 def index(request):
-    return render(request, 'books/index.html')
\ No newline at end of file
+    return render(request, 'books/index.html')
+
+@staff_member_required
+def admission_metrics(request):
+    return JsonResponse(admission_controller.snapshot())
@@ -0,0 +1,146 @@
+"""
+Warm-up run at application load so the first real request in a new worker
+does not pay for URL resolver construction, template compilation, lazy DRF
+settings and opening database connections.
+
+Controlled by environment variables read from ``books/wsgi.py`` and
+``books/asgi.py``:
+
+``BOOKS_WARMUP=0``
+    Skip warm-up entirely.
+``BOOKS_PRELOAD=1``
+    The application is loaded once in a master process and then forked
+    (``preload_app`` in ``gunicorn.conf.py``). Database connections are
+    not opened before the fork; the ``post_fork`` hook in
+    ``gunicorn.conf.py`` calls ``connect_databases`` in each worker
+    instead. Warmed objects are frozen out of the garbage collector so
+    workers keep sharing those pages copy-on-write.
+``BOOKS_WARMUP_CONNECT_DB=0``
+    Don't open database connections at load time.
+``BOOKS_WARMUP_PROFILE=1``
+    Print how long each phase of app loading and warm-up took. For
+    per-module import timings run the server with ``python -X importtime``.
+
+Database connections are thread-local, so opening them at load time only
+helps sync, single-threaded WSGI workers that serve requests on the thread
+that loaded the application. ``books/asgi.py`` always skips that phase;
+set ``BOOKS_WARMUP_CONNECT_DB=0`` for threaded WSGI servers. It also only
+covers databases with persistent connections (``CONN_MAX_AGE`` other than
+0, or a connection pool): otherwise Django closes the connection when the
+first request starts, and there is nothing to warm.
+"""
+import gc
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template.loader import get_template
+from django.urls import get_resolver, reverse
+
+WARMUP_TEMPLATES = [
+    'base.html',
+    'books/index.html',
+    'accounts/login.html',
+    'accounts/logout.html',
+    'accounts/signup.html',
+    'accounts/success.html',
+    'rest_framework/api.html',
+]
+
+
+def env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() not in ('', '0', 'false', 'no')
+
+
+def build_url_resolver():
+    resolver = get_resolver(settings.ROOT_URLCONF)
+    # reverse() populates the resolver's reverse/namespace dicts.
+    reverse('index')
+    reverse('products:product-list')
+    return resolver
+
+
+def load_drf():
+    from rest_framework.settings import api_settings
+
+    # api_settings imports these lazily on first access.
+    api_settings.DEFAULT_RENDERER_CLASSES
+    api_settings.DEFAULT_PARSER_CLASSES
+    api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    api_settings.DEFAULT_PERMISSION_CLASSES
+
+
+def compile_templates():
+    for name in WARMUP_TEMPLATES:
+        get_template(name)
+
+
+def persistent_connections():
+    """Connections that outlive a request, so opening them early is worthwhile."""
+    return [
+        conn for conn in connections.all()
+        if conn.settings_dict['CONN_MAX_AGE'] != 0 or conn.settings_dict['OPTIONS'].get('pool')
+    ]
+
+
+def connect_databases():
+    """
+    Open a connection for every database with persistent connections in the
+    calling thread; ``gunicorn.conf.py`` calls it after fork when preloading.
+    A database that is down is skipped rather than failing the worker.
+    """
+    for conn in persistent_connections():
+        try:
+            conn.ensure_connection()
+        except DatabaseError as e:
+            sys.stderr.write(f"[warmup] could not connect to {conn.alias!r}: {e}\n")
+
+
+def warm_up(preload=False, connect_db=True):
+    """Run every warm-up phase and return their durations in seconds."""
+    timings = {}
+    phases = [
+        ('url_resolver', build_url_resolver),
+        ('drf', load_drf),
+        ('templates', compile_templates),
+    ]
+    if connect_db and not preload and persistent_connections():
+        phases.append(('databases', connect_databases))
+
+    for name, phase in phases:
+        started = time.perf_counter()
+        phase()
+        timings[name] = time.perf_counter() - started
+
+    if preload:
+        # Don't hand shared sockets to forked workers, and keep the GC from
+        # touching (and so copying) the warmed objects in every child.
+        connections.close_all()
+        gc.freeze()
+    return timings
+
+
+def warm_up_application(load_application, connect_db=True):
+    """
+    Load the application via ``load_application`` and warm it up according
+    to the environment. Pass ``connect_db=False`` when requests are served
+    from other threads than this one. Returns the application.
+    """
+    started = time.perf_counter()
+    application = load_application()
+    timings = {'app_loading': time.perf_counter() - started}
+
+    if env_flag('BOOKS_WARMUP', default=True):
+        connect_db = connect_db and env_flag('BOOKS_WARMUP_CONNECT_DB', default=True)
+        timings.update(warm_up(preload=env_flag('BOOKS_PRELOAD'), connect_db=connect_db))
+
+    if env_flag('BOOKS_WARMUP_PROFILE'):
+        for name, seconds in timings.items():
+            sys.stderr.write(f"[warmup] {name}: {seconds * 1000:.1f} ms\n")
+        sys.stderr.write(f"[warmup] total: {sum(timings.values()) * 1000:.1f} ms\n")
+    return application
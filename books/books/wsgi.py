@@ -11,6 +11,8 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from books.warmup import warm_up_application
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'books.settings')
 
-application = get_wsgi_application()
+application = warm_up_application(get_wsgi_application)
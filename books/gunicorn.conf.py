@@ -0,0 +1,24 @@
+"""
+Gunicorn settings for the books project; run ``gunicorn`` from this directory.
+
+With ``BOOKS_PRELOAD=1`` the application is loaded and warmed up once in the
+master and workers are forked from it. Database connections can't be shared
+across the fork, so each worker opens its own in ``post_fork``. That only
+helps the default sync worker, which serves requests on the thread that runs
+the hook; see ``books/warmup.py``.
+"""
+import os
+
+from books.warmup import env_flag
+
+wsgi_app = 'books.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+preload_app = env_flag('BOOKS_PRELOAD')
+
+
+def post_fork(server, worker):
+    if preload_app and env_flag('BOOKS_WARMUP', default=True) and env_flag('BOOKS_WARMUP_CONNECT_DB', default=True):
+        from books.warmup import connect_databases
+
+        connect_databases()
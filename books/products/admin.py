@@ -1,3 +1,26 @@
 from django.contrib import admin
+from .facets import invalidate_facets
+from .models import ArchivedProduct, Product
 
-# Register your models here.
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('name', 'price', 'inventory', 'is_active', 'updated_at')
+    list_filter = ('is_active',)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_facets()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_facets()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_facets()
+
+
+@admin.register(ArchivedProduct)
+class ArchivedProductAdmin(admin.ModelAdmin):
+    list_display = ('name', 'price', 'inventory', 'updated_at', 'archived_at')
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .facets import invalidate_facets
+from .models import ArchivedProduct, Product
+
+ARCHIVED_FIELDS = ['id', 'name', 'description', 'price', 'inventory', 'is_active', 'created_at', 'updated_at']
+
+
+def archivable_products(older_than=None):
+    """Products untouched for longer than ``older_than`` or flagged inactive."""
+    if older_than is None:
+        older_than = timedelta(days=settings.PRODUCT_ARCHIVE_AFTER_DAYS)
+    cutoff = timezone.now() - older_than
+    return Product.objects.filter(Q(updated_at__lt=cutoff) | Q(is_active=False))
+
+
+def archive_products(older_than=None, batch_size=1000):
+    """
+    Move archivable products from the hot table into ``ArchivedProduct``.
+
+    Each batch is copied and deleted in its own transaction so the hot table
+    is never locked for the whole run. The batch is row-locked where the
+    backend supports it, and the delete re-applies the archive condition, so
+    a product updated or reactivated meanwhile stays in the hot table and
+    only the rows actually deleted are archived. Returns the number of rows
+    moved.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            candidates = archivable_products(older_than)
+            if connection.features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            rows = list(candidates.order_by('id').values(*ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                return moved
+
+            ids = [row['id'] for row in rows]
+            _, deleted = archivable_products(older_than).filter(id__in=ids).delete()
+            if deleted.get(Product._meta.label, 0) < len(rows):
+                still_hot = set(Product.objects.filter(id__in=ids).values_list('id', flat=True))
+                rows = [row for row in rows if row['id'] not in still_hot]
+            ArchivedProduct.objects.bulk_create([ArchivedProduct(**row) for row in rows])
+            transaction.on_commit(invalidate_facets)
+        moved += len(rows)
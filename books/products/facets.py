@@ -0,0 +1,80 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .filters import FILTER_PARAMS, STOCK_STATUSES, stock_filter
+
+VERSION_KEY = 'products:facets:version'
+
+
+def price_band_label(low, high):
+    return f'{low}+' if high is None else f'{low}-{high}'
+
+
+def price_band_filter(low, high):
+    condition = Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return condition
+
+
+def compute_facets(queryset):
+    """Count every price band and stock status with a single aggregate query."""
+    bands = settings.PRODUCT_PRICE_BANDS
+    aggregates = {'count': Count('id')}
+    for index, (low, high) in enumerate(bands):
+        aggregates[f'price_band_{index}'] = Count('id', filter=price_band_filter(low, high))
+    for status in STOCK_STATUSES:
+        aggregates[status] = Count('id', filter=stock_filter(status))
+    counts = queryset.aggregate(**aggregates)
+
+    return {
+        'count': counts['count'],
+        'price_bands': [
+            {'label': price_band_label(low, high), 'min': low, 'max': high, 'count': counts[f'price_band_{index}']}
+            for index, (low, high) in enumerate(bands)
+        ],
+        'stock': {status: counts[status] for status in STOCK_STATUSES},
+    }
+
+
+def facets_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(VERSION_KEY, version, timeout=None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def invalidate_facets():
+    """
+    Bump the version so every cached facet result is orphaned.
+
+    Call once after any product write: the API views, admin and
+    ``archive_products`` do. There are no model signals, so bulk writes
+    (``bulk_create``, ``QuerySet.update``/``delete``) must call it themselves.
+
+    The bump only reaches other worker processes when the default cache is
+    shared (``REDIS_URL``); with the per-process LocMemCache, other workers
+    keep their counts until ``PRODUCT_FACETS_CACHE_TIMEOUT`` expires.
+    """
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def cache_key(params):
+    filters = '&'.join(f'{name}={params[name]}' for name in FILTER_PARAMS if params.get(name))
+    digest = hashlib.md5(filters.encode()).hexdigest()
+    return f'products:facets:{facets_version()}:{digest}'
+
+
+def cached_facets(queryset, params):
+    key = cache_key(params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, timeout=settings.PRODUCT_FACETS_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,53 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+STOCK_STATUSES = ['in_stock', 'low_stock', 'out_of_stock']
+FILTER_PARAMS = ['q', 'min_price', 'max_price', 'stock']
+
+
+def stock_filter(status):
+    threshold = settings.PRODUCT_LOW_STOCK_THRESHOLD
+    return {
+        'in_stock': Q(inventory__gt=threshold),
+        'low_stock': Q(inventory__gt=0, inventory__lte=threshold),
+        'out_of_stock': Q(inventory__lte=0),
+    }[status]
+
+
+def parse_price(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        price = None
+    if price is None or not price.is_finite():
+        raise ValidationError({name: 'A valid number is required.'})
+    return price
+
+
+def filter_products(queryset, params):
+    """
+    Apply the product list filters from query ``params``:
+    ``q`` (name contains), ``min_price``, ``max_price`` and ``stock``.
+    """
+    if params.get('q'):
+        queryset = queryset.filter(name__icontains=params['q'])
+
+    min_price = parse_price(params, 'min_price')
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    max_price = parse_price(params, 'max_price')
+    if max_price is not None:
+        queryset = queryset.filter(price__lt=max_price)
+
+    stock = params.get('stock')
+    if stock:
+        if stock not in STOCK_STATUSES:
+            raise ValidationError({'stock': f'Must be one of {", ".join(STOCK_STATUSES)}.'})
+        queryset = queryset.filter(stock_filter(stock))
+    return queryset
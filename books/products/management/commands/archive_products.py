@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.archive import archive_products
+
+
+class Command(BaseCommand):
+    help = "Move stale or inactive products from the product table into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.PRODUCT_ARCHIVE_AFTER_DAYS,
+            help="Archive products not updated for this many days (inactive products are always archived).",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        moved = archive_products(timedelta(days=options['days']), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} products."))
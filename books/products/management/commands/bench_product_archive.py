@@ -0,0 +1,78 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from products.archive import archive_products
+from products.models import ArchivedProduct, Product
+from products.views import ProductList
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark product list/filter latency as the number of dead products grows, "
+        "with the dead rows left in the product table versus moved to the archive. "
+        "Runs inside a transaction that is rolled back, but empties both product tables and "
+        "holds their locks for the whole run, so it refuses to start on a database that has "
+        "products unless --force is given. Point it at a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hot', type=int, default=500, help="Number of live products.")
+        parser.add_argument('--steps', type=int, nargs='+', default=[0, 1000, 5000, 20000], help="Dead product counts to measure.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--force', action='store_true', help="Run even if the product tables already contain rows.")
+
+    def handle(self, *args, **options):
+        if not options['force'] and (Product.objects.exists() or ArchivedProduct.objects.exists()):
+            raise CommandError(
+                "The product tables are not empty. This benchmark deletes every product for the length "
+                "of the run; use a throwaway database or pass --force."
+            )
+        self.factory = APIRequestFactory()
+        self.repeat = options['repeat']
+        self.stdout.write(f"{'dead rows':>10} {'where':>8} {'list ms':>10} {'filter ms':>10}")
+        try:
+            with transaction.atomic():
+                Product.objects.all().delete()
+                ArchivedProduct.objects.all().delete()
+                self.create_products(options['hot'])
+                for dead in sorted(options['steps']):
+                    ArchivedProduct.objects.all().delete()
+                    self.create_products(dead, is_active=False)
+                    self.report(dead, 'hot')
+                    archive_products()
+                    self.report(dead, 'archive')
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_products(self, count, is_active=True):
+        Product.objects.bulk_create([
+            Product(
+                name=f'Product {i}', description='', price=Decimal(i % 500) + Decimal('0.99'),
+                inventory=i % 50, is_active=is_active,
+            )
+            for i in range(count)
+        ], batch_size=1000)
+
+    def report(self, dead, where):
+        view = ProductList.as_view()
+        list_ms = self.time(lambda: view(self.factory.get('/api/products/')))
+        filter_ms = self.time(lambda: list(Product.objects.filter(price__lt=100, inventory__gt=0).values_list('id', flat=True)))
+        self.stdout.write(f"{dead:>10} {where:>8} {list_ms:>10.2f} {filter_ms:>10.2f}")
+
+    def time(self, fn):
+        best = None
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            fn()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
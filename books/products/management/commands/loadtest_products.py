@@ -0,0 +1,111 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from books.middleware import get_admission_settings
+from products.facets import invalidate_facets
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a concurrent read/write load against the product API in-process and report "
+        "throughput and latency for the active database profile. Run once with BOOKS_DB=sqlite "
+        "and once with BOOKS_DB=postgres to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200, help="Requests per thread.")
+        parser.add_argument('--seed', type=int, default=1000, help="Products created before the run; reads and updates target only these.")
+        parser.add_argument('--write-ratio', type=float, default=0.2, help="Share of requests that create or update a product.")
+
+    def handle(self, *args, **options):
+        # Updates and cleanup only target rows created here; existing products are never modified or deleted.
+        seeded = Product.objects.bulk_create([
+            Product(name=f'Load {i}', description='', price='9.99', inventory=i % 50)
+            for i in range(options['seed'])
+        ], batch_size=1000)
+        invalidate_facets()
+        self.ids = [product.pk for product in seeded]
+        self.options = options
+        self.created = []
+        self.lock = threading.Lock()
+
+        # All threads share one process here, so per-worker concurrency limits
+        # would shed the load test itself rather than measure the database.
+        limits = {
+            route_class: max(limit, options['threads'])
+            for route_class, limit in get_admission_settings()['CONCURRENCY_LIMITS'].items()
+        }
+        admission = {**getattr(settings, 'ADMISSION_CONTROL', {}), 'CONCURRENCY_LIMITS': limits}
+        try:
+            started = time.perf_counter()
+            with override_settings(ADMISSION_CONTROL=admission), ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                results = list(executor.map(self.worker, range(options['threads'])))
+            elapsed = time.perf_counter() - started
+        finally:
+            Product.objects.filter(id__in=self.ids + self.created).delete()
+            invalidate_facets()
+
+        latencies = sorted(latency for worker in results for latency, _ in worker)
+        errors = sum(1 for worker in results for _, ok in worker if not ok)
+        total = len(latencies)
+        self.stdout.write(f"profile: {connection.vendor}")
+        self.stdout.write(f"requests: {total} in {elapsed:.2f}s ({total / elapsed:.1f} req/s), errors: {errors}")
+        if latencies:
+            self.stdout.write(
+                "latency ms: p50 {:.1f}  p95 {:.1f}  p99 {:.1f}  max {:.1f}".format(
+                    statistics.median(latencies),
+                    latencies[int(total * 0.95) - 1 if total > 1 else 0],
+                    latencies[int(total * 0.99) - 1 if total > 1 else 0],
+                    latencies[-1],
+                )
+            )
+
+    def worker(self, index):
+        client = Client(HTTP_HOST='localhost')
+        write_every = round(1 / self.options['write_ratio']) if self.options['write_ratio'] > 0 else 0
+        results = []
+        try:
+            for i in range(self.options['requests']):
+                pk = self.ids[(index * self.options['requests'] + i) % len(self.ids)] if self.ids else None
+                started = time.perf_counter()
+                try:
+                    if write_every and i % write_every == 0:
+                        response = self.write(client, pk, i)
+                    elif i % 10 == 1 or pk is None:
+                        response = client.get(reverse('products:product-list'))
+                    else:
+                        response = client.get(reverse('products:product-detail', args=[pk]))
+                    ok = response.status_code < 400
+                except Exception:
+                    ok = False
+                results.append(((time.perf_counter() - started) * 1000, ok))
+        finally:
+            connections.close_all()
+        return results
+
+    def write(self, client, pk, i):
+        if pk is None or i % 2:
+            response = client.post(
+                reverse('products:product-list'),
+                {'name': 'Load write', 'description': 'Load test', 'price': '5.00', 'inventory': 1},
+                content_type='application/json',
+            )
+            if response.status_code == 201:
+                with self.lock:
+                    self.created.append(response.json()['id'])
+            return response
+        return client.put(
+            reverse('products:product-detail', args=[pk]),
+            {'name': 'Load update', 'price': '7.50', 'inventory': i % 50},
+            content_type='application/json',
+        )
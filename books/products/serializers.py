@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Product
+from .models import ArchivedProduct, Product
 
 class ProductSerializer(serializers.ModelSerializer):
     price = serializers.DecimalField(max_digits=10, decimal_places=2)
@@ -16,4 +16,11 @@ class ProductSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class ArchivedProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedProduct
+        fields = ['id', 'name', 'description', 'price', 'inventory', 'is_active', 'created_at', 'updated_at', 'archived_at']
+        read_only_fields = fields
@@ -5,8 +5,20 @@ from django.urls import reverse
 
 from rest_framework.test import APIRequestFactory, APITestCase
 
-from products.models import Product
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+from unittest import mock
+
+from products.archive import archive_products
+from products.models import ArchivedProduct, Product
+from products.serializers import ProductSerializer
 from products.views import ProductList, ProductDetail
+from books.querybudget import QueryBudgetExceeded
 
 class ProductListViewTest(TestCase):
     def setUp(self):
@@ -158,8 +170,10 @@ class ProductAPITestCase(APITestCase):
 
     def test_list(self):
         request = self.factory.get(reverse('products:product-list'))
-        response = ProductList.as_view()(request)
+        with CaptureQueriesContext(connection) as queries:
+            response = ProductList.as_view()(request)
         self.assertEqual(response.status_code, 200)
+        self.assertIn('ORDER BY', queries[-1]['sql'])
 
         expected_data = [
             {'id': self.product1.id, 'name': 'Product 1', 'description': '', 'price': '10.00', 'inventory': 10},
@@ -182,7 +196,7 @@ class ProductAPITestCase(APITestCase):
         response = ProductList.as_view()(request)
         self.assertEqual(response.status_code, 201)
         self.maxDiff = None  # Print the full difference between the expected and actual values in case of failure
-        expected_data = {'id': 3, 'name': 'Product 3', 'price': '30.00', 'inventory': 30, 'description': 'Test product', 'created_at': response.data['created_at'], 'updated_at': response.data['updated_at']}
+        expected_data = {'id': Product.objects.latest('id').id, 'name': 'Product 3', 'price': '30.00', 'inventory': 30, 'description': 'Test product', 'created_at': response.data['created_at'], 'updated_at': response.data['updated_at']}
         self.assertEqual(response.data, expected_data)
         self.assertEqual(Product.objects.count(), 3)
 
@@ -241,3 +255,226 @@ class ProductAPITestCase(APITestCase):
         response = ProductDetail.as_view()(request, pk=self.product1.id)
         self.assertEqual(response.status_code, 204)
         self.assertEqual(Product.objects.count(), 1)
+
+class ProductBatchViewTest(APITestCase):
+    def setUp(self):
+        self.product1 = Product.objects.create(name='Product 1', price=10.00, inventory=10)
+        self.product2 = Product.objects.create(name='Product 2', price=20.00, inventory=20)
+
+    def test_ids(self):
+        missing_id = self.product2.id + 100
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse('products:product-batch'),
+                {'ids': [self.product2.id, missing_id, self.product1.id]},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual([item['id'] for item in response.data], [self.product2.id, missing_id, self.product1.id])
+        self.assertEqual([item['status'] for item in response.data], [200, 404, 200])
+        self.assertEqual(response.data[0]['data']['name'], 'Product 2')
+        self.assertEqual(response.data[2]['data']['price'], '10.00')
+
+    def test_requests(self):
+        data = {'requests': [
+            {'method': 'GET', 'url': reverse('products:product-detail', args=[self.product1.id])},
+            {'url': 'http://testserver' + reverse('products:product-detail', args=[self.product2.id])},
+            {'method': 'DELETE', 'url': reverse('products:product-detail', args=[self.product1.id])},
+            {'method': 'GET', 'url': reverse('products:product-list')},
+        ]}
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('products:product-batch'), data, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual([item['status'] for item in response.data], [200, 200, 405, 400])
+        self.assertEqual(response.data[1]['data']['name'], 'Product 2')
+
+    def test_invalid(self):
+        response = self.client.post(reverse('products:product-batch'), {'ids': [1], 'requests': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(reverse('products:product-batch'), {'ids': list(range(101))}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(reverse('products:product-batch'), [1, 2], format='json')
+        self.assertEqual(response.status_code, 400)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                reverse('products:product-batch'), {'ids': ['abc', 1.7, True, 10 ** 30, -1]}, format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['status'] for item in response.data], [400, 400, 400, 404, 404])
+
+        response = self.client.post(
+            reverse('products:product-batch'), {'requests': [{'url': '/api/product/%d/' % 10 ** 30}]}, format='json',
+        )
+        self.assertEqual(response.data[0]['status'], 404)
+
+        response = self.client.post(reverse('products:product-batch'), {'ids': [str(self.product1.id)]}, format='json')
+        self.assertEqual(response.data[0]['status'], 200)
+
+
+class ProductArchiveTest(APITestCase):
+    def setUp(self):
+        self.hot = Product.objects.create(name='Hot', price=10.00, inventory=10)
+        self.inactive = Product.objects.create(name='Inactive', price=20.00, inventory=0, is_active=False)
+        self.stale = Product.objects.create(name='Stale', price=30.00, inventory=5)
+        self.stale_updated_at = timezone.now() - timedelta(days=400)
+        Product.objects.filter(id=self.stale.id).update(updated_at=self.stale_updated_at)
+
+    def test_archive_products(self):
+        moved = archive_products(timedelta(days=365), batch_size=1)
+        self.assertEqual(moved, 2)
+
+        self.assertEqual(list(Product.objects.values_list('id', flat=True)), [self.hot.id])
+        archived = ArchivedProduct.objects.get(id=self.stale.id)
+        self.assertEqual(archived.name, 'Stale')
+        self.assertEqual(archived.updated_at, self.stale_updated_at)
+        self.assertFalse(ArchivedProduct.objects.get(id=self.inactive.id).is_active)
+
+    def test_archive_skips_reactivated(self):
+        # Simulate the product being reactivated between the batch SELECT and the DELETE
+        original_delete = QuerySet.delete
+        inactive_id = self.inactive.id
+
+        def delete(queryset):
+            Product.objects.filter(id=inactive_id).update(is_active=True, name='Reactivated')
+            return original_delete(queryset)
+
+        with mock.patch.object(QuerySet, 'delete', delete):
+            moved = archive_products(timedelta(days=365))
+
+        self.assertEqual(moved, 1)
+        self.assertEqual(Product.objects.get(id=inactive_id).name, 'Reactivated')
+        self.assertEqual(list(ArchivedProduct.objects.values_list('id', flat=True)), [self.stale.id])
+
+    def test_archive_command(self):
+        out = StringIO()
+        call_command('archive_products', days=365, stdout=out)
+        self.assertIn('Archived 2 products.', out.getvalue())
+
+    def test_bench_command_refuses_populated_tables(self):
+        with self.assertRaisesMessage(CommandError, 'pass --force'):
+            call_command('bench_product_archive', stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 3)
+
+        call_command('bench_product_archive', hot=5, steps=[0, 3], repeat=1, force=True, stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertFalse(ArchivedProduct.objects.exists())
+
+    def test_endpoints(self):
+        archive_products(timedelta(days=365))
+
+        response = self.client.get(reverse('products:product-list'))
+        self.assertEqual([product['id'] for product in response.data], [self.hot.id])
+        response = self.client.get(reverse('products:product-detail', args=[self.stale.id]))
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(reverse('products:archived-product-list'))
+        self.assertEqual(sorted(product['id'] for product in response.data), [self.inactive.id, self.stale.id])
+        response = self.client.get(reverse('products:archived-product-detail', args=[self.stale.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Stale')
+
+
+class ProductFacetsViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        Product.objects.create(name='Cheap book', price=5.00, inventory=0)
+        Product.objects.create(name='Cheap pen', price=9.99, inventory=3)
+        Product.objects.create(name='Mid book', price=30.00, inventory=20)
+        Product.objects.create(name='Expensive book', price=150.00, inventory=8)
+
+    def test_facets(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('products:product-facets'))
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(
+            [(band['label'], band['count']) for band in response.data['price_bands']],
+            [('0-10', 2), ('10-25', 0), ('25-50', 1), ('50-100', 0), ('100+', 1)],
+        )
+        self.assertEqual(response.data['stock'], {'in_stock': 2, 'low_stock': 1, 'out_of_stock': 1})
+
+    def test_filters(self):
+        response = self.client.get(reverse('products:product-facets'), {'q': 'book', 'min_price': '10'})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['stock'], {'in_stock': 2, 'low_stock': 0, 'out_of_stock': 0})
+
+        # The list applies the same filters
+        response = self.client.get(reverse('products:product-list'), {'q': 'book', 'min_price': '10'})
+        self.assertEqual([product['name'] for product in response.data], ['Mid book', 'Expensive book'])
+        response = self.client.get(reverse('products:product-list'), {'stock': 'low_stock'})
+        self.assertEqual([product['name'] for product in response.data], ['Cheap pen'])
+
+        response = self.client.get(reverse('products:product-facets'), {'stock': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('products:product-list'), {'max_price': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('products:product-list'), {'min_price': 'NaN'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('products:product-facets'), {'min_price': 'Infinity'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cache_invalidation(self):
+        self.client.get(reverse('products:product-facets'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('products:product-facets'))
+        self.assertEqual(response.data['count'], 4)
+
+        response = self.client.post(
+            reverse('products:product-list'),
+            {'name': 'New book', 'description': 'New', 'price': '12.00', 'inventory': 1},
+            format='json',
+        )
+        product_id = response.data['id']
+        response = self.client.get(reverse('products:product-facets'))
+        self.assertEqual(response.data['count'], 5)
+
+        self.client.put(reverse('products:product-detail', args=[product_id]), {'inventory': 0, 'price': '12.00'}, format='json')
+        response = self.client.get(reverse('products:product-facets'))
+        self.assertEqual(response.data['stock']['out_of_stock'], 2)
+
+        self.client.patch(reverse('products:product-detail', args=[product_id]), {'inventory': 30, 'price': '12.00'}, format='json')
+        response = self.client.get(reverse('products:product-facets'))
+        self.assertEqual(response.data['stock']['out_of_stock'], 1)
+        self.assertEqual(response.data['stock']['in_stock'], 3)
+
+        self.client.delete(reverse('products:product-detail', args=[product_id]))
+        response = self.client.get(reverse('products:product-facets'))
+        self.assertEqual(response.data['count'], 4)
+
+    def test_archive_invalidates(self):
+        self.client.get(reverse('products:product-facets'))
+        Product.objects.filter(name='Cheap pen').update(is_active=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_products(timedelta(days=365))
+        response = self.client.get(reverse('products:product-facets'))
+        self.assertEqual(response.data['count'], 3)
+
+
+class ProductQueryBudgetTest(APITestCase):
+    def test_list_query_count_is_constant(self):
+        Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='', price=10.00, inventory=i) for i in range(50)
+        ])
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('products:product-list'))
+        self.assertEqual(len(response.data), 50)
+
+    def test_per_row_query_exceeds_budget(self):
+        Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='', price=10.00, inventory=i) for i in range(3)
+        ])
+        to_representation = ProductSerializer.to_representation
+
+        def per_row_query(serializer, instance):
+            Product.objects.filter(pk=instance.pk).exists()
+            return to_representation(serializer, instance)
+
+        with mock.patch.object(ProductSerializer, 'to_representation', per_row_query):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'Query budget exceeded in ProductList: 4 queries'):
+                self.client.get(reverse('products:product-list'))
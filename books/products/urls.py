@@ -1,9 +1,13 @@
 from django.urls import path
-from .views import ProductDetail, ProductList
+from .views import ArchivedProductDetail, ArchivedProductList, ProductBatch, ProductDetail, ProductFacets, ProductList
 
 app_name = 'products'
 
 urlpatterns = [
     path('products/', ProductList.as_view(), name='product-list'),
     path('product/<int:pk>/', ProductDetail.as_view(), name='product-detail'),
+    path('products/facets/', ProductFacets.as_view(), name='product-facets'),
+    path('products/batch/', ProductBatch.as_view(), name='product-batch'),
+    path('products/archived/', ArchivedProductList.as_view(), name='archived-product-list'),
+    path('product/archived/<int:pk>/', ArchivedProductDetail.as_view(), name='archived-product-detail'),
 ]
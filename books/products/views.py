@@ -1,18 +1,59 @@
+from urllib.parse import urlparse
+
 from django.http import Http404
+from django.urls import Resolver404, resolve
 from rest_framework import generics
-from .models import Product
-from .serializers import ProductSerializer
+from .facets import cached_facets, invalidate_facets
+from .filters import filter_products
+from .models import ArchivedProduct, Product
+from .serializers import ArchivedProductSerializer, ProductSerializer
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
-from rest_framework.status import HTTP_200_OK, HTTP_404_NOT_FOUND, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_204_NO_CONTENT
+from rest_framework.status import HTTP_200_OK, HTTP_404_NOT_FOUND, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_204_NO_CONTENT, HTTP_405_METHOD_NOT_ALLOWED
+
+from books.querybudget import query_budget
 
 class ProductList(generics.ListCreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
-class ProductList(generics.ListCreateAPIView):
+class InvalidateFacetsMixin:
+    """Drop cached facet counts after every write, whichever handler (POST/PUT/PATCH/DELETE) made it."""
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        invalidate_facets()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_facets()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate_facets()
+
+
+@query_budget(max_queries=2, max_time_ms=1000)
+class ProductList(InvalidateFacetsMixin, generics.ListCreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    iterator_chunk_size = 2000
+
+    def get_queryset(self):
+        # A stable order, so streamed results don't depend on the heap layout.
+        return filter_products(super().get_queryset(), self.request.query_params).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        # Stream rows instead of filling the queryset cache; this is a
+        # server-side cursor on PostgreSQL.
+        serializer = self.get_serializer(queryset.iterator(chunk_size=self.iterator_chunk_size), many=True)
+        return Response(serializer.data)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -24,7 +65,8 @@ class ProductList(generics.ListCreateAPIView):
             return Response(serializer.errors, status=HTTP_400_BAD_REQUEST)
 
 
-class ProductDetail(generics.RetrieveUpdateDestroyAPIView):
+@query_budget(max_queries=3, max_time_ms=1000)
+class ProductDetail(InvalidateFacetsMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
@@ -42,11 +84,108 @@ class ProductDetail(generics.RetrieveUpdateDestroyAPIView):
 
 
         if serializer.is_valid():
-            serializer.save()
+            self.perform_update(serializer)
             return Response(serializer.data, status=HTTP_200_OK)
         else:
             return Response(serializer.errors, status=HTTP_400_BAD_REQUEST)
     def delete(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.delete()
-        return Response(status=HTTP_204_NO_CONTENT)
\ No newline at end of file
+        self.perform_destroy(instance)
+        return Response(status=HTTP_204_NO_CONTENT)
+
+
+@query_budget(max_queries=2, max_time_ms=1000)
+class ProductFacets(generics.GenericAPIView):
+    """Price band and stock status counts for the products matching the list filters."""
+    queryset = Product.objects.all()
+
+    def get(self, request, *args, **kwargs):
+        queryset = filter_products(self.get_queryset(), request.query_params)
+        return Response(cached_facets(queryset, request.query_params), status=HTTP_200_OK)
+
+
+@query_budget(max_queries=2, max_time_ms=1000)
+class ArchivedProductList(generics.ListAPIView):
+    """Read-only access to archived products; the default endpoints only serve the hot table."""
+    queryset = ArchivedProduct.objects.all()
+    serializer_class = ArchivedProductSerializer
+
+
+@query_budget(max_queries=2, max_time_ms=1000)
+class ArchivedProductDetail(generics.RetrieveAPIView):
+    queryset = ArchivedProduct.objects.all()
+    serializer_class = ArchivedProductSerializer
+
+
+@query_budget(max_queries=2, max_time_ms=1000)
+class ProductBatch(generics.GenericAPIView):
+    """
+    Resolve many product reads in one round trip and one query.
+
+    Accepts either ``{"ids": [1, 2, 3]}`` or
+    ``{"requests": [{"method": "GET", "url": "/api/product/1/"}, ...]}``
+    where every url must resolve to ``products:product-detail``. Results
+    come back in request order, each with its own status code.
+    """
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    max_batch_size = 100
+    max_pk = 2 ** 63 - 1
+    detail_view_name = 'products:product-detail'
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, dict):
+            return Response({'detail': 'Request body must be an object.'}, status=HTTP_400_BAD_REQUEST)
+
+        ids = request.data.get('ids')
+        sub_requests = request.data.get('requests')
+
+        if (ids is None) == (sub_requests is None):
+            return Response({'detail': 'Provide exactly one of "ids" or "requests".'}, status=HTTP_400_BAD_REQUEST)
+
+        items = ids if ids is not None else sub_requests
+        if not isinstance(items, list):
+            return Response({'detail': 'Batch must be a list.'}, status=HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return Response({'detail': f'Batch may contain at most {self.max_batch_size} items.'}, status=HTTP_400_BAD_REQUEST)
+
+        if ids is not None:
+            entries = [self.parse_id(item) for item in items]
+        else:
+            entries = [self.parse_sub_request(item) for item in items]
+
+        # Ids outside the primary key range can't exist; keep them away from the DB.
+        pks = {pk for pk, error in entries if error is None and 0 < pk <= self.max_pk}
+        products = self.get_queryset().in_bulk(pks) if pks else {}
+
+        results = []
+        for pk, error in entries:
+            if error is not None:
+                results.append({'id': pk, 'status': error[0], 'data': {'detail': error[1]}})
+            elif pk not in products:
+                results.append({'id': pk, 'status': HTTP_404_NOT_FOUND, 'data': {'detail': 'Not found.'}})
+            else:
+                serializer = self.get_serializer(products[pk])
+                results.append({'id': pk, 'status': HTTP_200_OK, 'data': serializer.data})
+
+        return Response(results, status=HTTP_200_OK)
+
+    def parse_id(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value, None
+        if isinstance(value, str) and value.isascii() and value.isdigit():
+            return int(value), None
+        return None, (HTTP_400_BAD_REQUEST, 'Invalid product id.')
+
+    def parse_sub_request(self, sub_request):
+        if not isinstance(sub_request, dict):
+            return None, (HTTP_400_BAD_REQUEST, 'Sub-request must be an object.')
+        if str(sub_request.get('method', 'GET')).upper() != 'GET':
+            return None, (HTTP_405_METHOD_NOT_ALLOWED, 'Only GET sub-requests are supported.')
+        try:
+            match = resolve(urlparse(str(sub_request.get('url', ''))).path)
+        except Resolver404:
+            return None, (HTTP_400_BAD_REQUEST, 'Sub-request url does not resolve.')
+        if match.view_name != self.detail_view_name:
+            return None, (HTTP_400_BAD_REQUEST, f'Sub-request url must target {self.detail_view_name}.')
+        return match.kwargs['pk'], None